@@ -1,131 +1,187 @@
 import os
+from dataclasses import dataclass, field
+from functools import lru_cache
 from pathlib import Path
-from typing import Optional
+from types import MappingProxyType
+from typing import Any, Mapping, Optional, Set
 from dotenv import load_dotenv
-load_dotenv()
 
+_DOTENV_LOADED = False
+
+# returned for unknown agents so get_agent_config never allocates
+_EMPTY_CONFIG: Mapping[str, Any] = MappingProxyType({})
+
+# log directories already created by ensure_log_directory()
+_dirs_created: Set[Path] = set()
+
+def _env(name: str, default: Optional[str] = None):
+    return lambda: os.getenv(name, default)
+
+def _env_int(name: str, default: int):
+    return lambda: int(os.getenv(name, default))
+
+def _env_optional_int(name: str):
+    # unset or empty means "not configured"
+    return lambda: int(os.environ[name]) if os.getenv(name) else None
+
+def _env_bool(name: str, default: str = 'true'):
+    return lambda: os.getenv(name, default).lower() == 'true'
+
+@dataclass(frozen=True, slots=True)
 class Settings:
-    """Configuration settings for the database..."""
-
-    def __init__(self):
-        # Source Database (Postgres)
-        self.SOURCE_DB_HOST = os.getenv('SOURCE_DB_HOST', 'localhost')
-        self.SOURCE_DB_PORT = int(os.getenv('SOURCE_DB_PORT', 5432))
-        self.SOURCE_DB_NAME = os.getenv('SOURCE_DB_NAME')
-        self.SOURCE_DB_USER = os.getenv('SOURCE_DB_USER')
-        self.SOURCE_DB_PASSWORD = os.getenv('SOURCE_DB_PASSWORD')
-        
-        # TimescaleDB (Meta Database)
-        self.META_DB_HOST = os.getenv('META_DB_HOST', 'localhost')
-        self.META_DB_PORT = int(os.getenv('META_DB_PORT', 5433))
-        self.META_DB_NAME = os.getenv('META_DB_NAME', 'agentic_meta')
-        self.META_DB_USER = os.getenv('META_DB_USER')
-        self.META_DB_PASSWORD = os.getenv('META_DB_PASSWORD')
-        
-        # Database ID
-        self.DB_ID = os.getenv('DB_ID')
-        
-        # Agent Configuration
-        self.MONITORING_ENABLED = os.getenv('MONITORING_ENABLED', 'true').lower() == 'true'
-        self.MONITORING_FREQUENCY = int(os.getenv('MONITORING_FREQUENCY', 60))
-        
-        self.PERFORMANCE_ENABLED = os.getenv('PERFORMANCE_ENABLED', 'true').lower() == 'true'
-        self.PERFORMANCE_SLOW_THRESHOLD_MS = int(os.getenv('PERFORMANCE_SLOW_THRESHOLD_MS', 500))
-        
-        self.INDEXING_ENABLED = os.getenv('INDEXING_ENABLED', 'true').lower() == 'true'
-        self.INDEXING_FREQUENCY = int(os.getenv('INDEXING_FREQUENCY', 3600))
-        
-        self.SEMANTIC_ENABLED = os.getenv('SEMANTIC_ENABLED', 'true').lower() == 'true'
-        self.SEMANTIC_FREQUENCY = int(os.getenv('SEMANTIC_FREQUENCY', 86400))
-        
-        # AI Configuration
-        self.OPENAI_API_KEY = os.getenv('OPENAI_API_KEY')
-        self.AI_MODEL = os.getenv('AI_MODEL', 'gpt-4')
-        self.AI_ENABLED = bool(self.OPENAI_API_KEY)
-        
-        # Logging
-        self.LOG_LEVEL = os.getenv('LOG_LEVEL', 'INFO').upper()
-        self.LOG_FILE = os.getenv('LOG_FILE', 'logs/agent.log')
-        self.STRUCTURED_LOG_FILE = os.getenv('STRUCTURED_LOG_FILE', 'logs/structured.jsonl')
-        
-        # Deduplication
-        self.DEDUP_BUCKET_MINUTES = int(os.getenv('DEDUP_BUCKET_MINUTES', 5))
-        self.DEDUP_LOOKBACK_HOURS = int(os.getenv('DEDUP_LOOKBACK_HOURS', 1))
-        
-        # Event Channels
-        self.CHANNEL_MONITORING = 'monitoring_events'
-        self.CHANNEL_PERFORMANCE = 'performance_events'
-        self.CHANNEL_SEMANTIC = 'semantic_events'
-        self.CHANNEL_APPROVAL = 'approval_events'
-        
-        # Validate required settings
-        self._validate()        
+    """Configuration settings for the database...
+    Values are read from the environment once at construction and frozen afterwards."""
 
-    def _validate(self):
-        """validate required configuration."""
-        required = [
-            ('SOURCE_DB_NAME', self.SOURCE_DB_NAME),
-            ('SOURCE_DB_USER', self.SOURCE_DB_USER),
-            ('SOURCE_DB_PASSWORD', self.SOURCE_DB_PASSWORD),
-            ('META_DB_USER', self.META_DB_USER),
-            ('META_DB_PASSWORD', self.META_DB_PASSWORD),
-            ('DB_ID', self.DB_ID)
-        ]
+    # Source Database (Postgres)
+    SOURCE_DB_HOST: str = field(default_factory=_env('SOURCE_DB_HOST', 'localhost'))
+    SOURCE_DB_PORT: int = field(default_factory=_env_int('SOURCE_DB_PORT', 5432))
+    SOURCE_DB_NAME: Optional[str] = field(default_factory=_env('SOURCE_DB_NAME'))
+    SOURCE_DB_USER: Optional[str] = field(default_factory=_env('SOURCE_DB_USER'))
+    SOURCE_DB_PASSWORD: Optional[str] = field(default_factory=_env('SOURCE_DB_PASSWORD'), repr=False)
 
-        missing = [name for name, value in required if not value]
+    # TimescaleDB (Meta Database)
+    META_DB_HOST: str = field(default_factory=_env('META_DB_HOST', 'localhost'))
+    META_DB_PORT: int = field(default_factory=_env_int('META_DB_PORT', 5433))
+    META_DB_NAME: str = field(default_factory=_env('META_DB_NAME', 'agentic_meta'))
+    META_DB_USER: Optional[str] = field(default_factory=_env('META_DB_USER'))
+    META_DB_PASSWORD: Optional[str] = field(default_factory=_env('META_DB_PASSWORD'), repr=False)
 
-        if missing:
-            raise ValueError(f"Missing required env variables:{', '.join(missing)}")
+    # Connection pools
+    SOURCE_DB_POOL_MIN: int = field(default_factory=_env_int('SOURCE_DB_POOL_MIN', 10))
+    SOURCE_DB_POOL_MAX: int = field(default_factory=_env_int('SOURCE_DB_POOL_MAX', 25))
+    META_DB_POOL_MIN: int = field(default_factory=_env_int('META_DB_POOL_MIN', 10))
+    META_DB_POOL_MAX: int = field(default_factory=_env_int('META_DB_POOL_MAX', 25))
+    DB_STATEMENT_CACHE_SIZE: int = field(default_factory=_env_int('DB_STATEMENT_CACHE_SIZE', 1024))
+    # seconds; unset means no client-side timeout (VACUUM / CREATE INDEX CONCURRENTLY can run long)
+    DB_COMMAND_TIMEOUT: Optional[int] = field(default_factory=_env_optional_int('DB_COMMAND_TIMEOUT'))
+    DB_MAX_INACTIVE_CONNECTION_LIFETIME: int = field(default_factory=_env_int('DB_MAX_INACTIVE_CONNECTION_LIFETIME', 300))
+    DB_JIT_ENABLED: bool = field(default_factory=_env_bool('DB_JIT_ENABLED'))
+
+    # Event loop (uvloop is used when installed)
+    UVLOOP_ENABLED: bool = field(default_factory=_env_bool('UVLOOP_ENABLED'))
+
+    # Database ID
+    DB_ID: Optional[str] = field(default_factory=_env('DB_ID'))
+
+    # Agent Configuration
+    MONITORING_ENABLED: bool = field(default_factory=_env_bool('MONITORING_ENABLED'))
+    MONITORING_FREQUENCY: int = field(default_factory=_env_int('MONITORING_FREQUENCY', 60))
+
+    PERFORMANCE_ENABLED: bool = field(default_factory=_env_bool('PERFORMANCE_ENABLED'))
+    PERFORMANCE_SLOW_THRESHOLD_MS: int = field(default_factory=_env_int('PERFORMANCE_SLOW_THRESHOLD_MS', 500))
+
+    INDEXING_ENABLED: bool = field(default_factory=_env_bool('INDEXING_ENABLED'))
+    INDEXING_FREQUENCY: int = field(default_factory=_env_int('INDEXING_FREQUENCY', 3600))
+
+    SEMANTIC_ENABLED: bool = field(default_factory=_env_bool('SEMANTIC_ENABLED'))
+    SEMANTIC_FREQUENCY: int = field(default_factory=_env_int('SEMANTIC_FREQUENCY', 86400))
 
-    @property
-    def POSTGRES_URL(self) -> str:
-        return (
+    # AI Configuration
+    OPENAI_API_KEY: Optional[str] = field(default_factory=_env('OPENAI_API_KEY'), repr=False)
+    AI_MODEL: str = field(default_factory=_env('AI_MODEL', 'gpt-4'))
+
+    # Logging
+    LOG_LEVEL: str = field(default_factory=lambda: os.getenv('LOG_LEVEL', 'INFO').upper())
+    LOG_FILE: str = field(default_factory=_env('LOG_FILE', 'logs/agent.log'))
+    STRUCTURED_LOG_FILE: str = field(default_factory=_env('STRUCTURED_LOG_FILE', 'logs/structured.jsonl'))
+
+    # Deduplication
+    DEDUP_BUCKET_MINUTES: int = field(default_factory=_env_int('DEDUP_BUCKET_MINUTES', 5))
+    DEDUP_LOOKBACK_HOURS: int = field(default_factory=_env_int('DEDUP_LOOKBACK_HOURS', 1))
+    # sha256 | blake2b_128 | xxh3_128 (needs xxhash); changing it stops new fingerprints matching existing rows
+    DEDUP_FINGERPRINT_ALGORITHM: str = field(default_factory=lambda: os.getenv('DEDUP_FINGERPRINT_ALGORITHM', 'sha256').lower())
+
+    # Event Channels
+    CHANNEL_MONITORING: str = 'monitoring_events'
+    CHANNEL_PERFORMANCE: str = 'performance_events'
+    CHANNEL_SEMANTIC: str = 'semantic_events'
+    CHANNEL_APPROVAL: str = 'approval_events'
+
+    # Derived once in __post_init__
+    AI_ENABLED: bool = field(init=False)
+    POSTGRES_URL: str = field(init=False, repr=False)
+    TIMESCALE_URL: str = field(init=False, repr=False)
+    _agent_configs: Mapping[str, Mapping[str, Any]] = field(init=False, repr=False, compare=False)
+
+    def __post_init__(self):
+        # Validate required settings
+        self._validate()
+
+        # frozen dataclass: derived fields have to go through object.__setattr__
+        object.__setattr__(self, 'AI_ENABLED', bool(self.OPENAI_API_KEY))
+        object.__setattr__(self, 'POSTGRES_URL', (
             f"postgresql://{self.SOURCE_DB_USER}:{self.SOURCE_DB_PASSWORD}"
             f"@{self.SOURCE_DB_HOST}:{self.SOURCE_DB_PORT}/{self.SOURCE_DB_NAME}"
-        )
-
-    @property
-    def TIMESCALE_URL(self) -> str:
-        return (
+        ))
+        object.__setattr__(self, 'TIMESCALE_URL', (
             f"postgresql://{self.META_DB_USER}:{self.META_DB_PASSWORD}"
             f"@{self.META_DB_HOST}:{self.META_DB_PORT}/{self.META_DB_NAME}"
-        )
-
-    def get_agent_config(self, agent_name: str) -> dict:
-        """Get configuration for a specific agent."""
-        configs = {
-            'monitoring': {
+        ))
+        object.__setattr__(self, '_agent_configs', MappingProxyType({
+            'monitoring': MappingProxyType({
                 'enabled': self.MONITORING_ENABLED,
                 'frequency': self.MONITORING_FREQUENCY,
                 'channel': self.CHANNEL_MONITORING
-            },
-            'performance': {
+            }),
+            'performance': MappingProxyType({
                 'enabled': self.PERFORMANCE_ENABLED,
                 'slow_threshold_ms': self.PERFORMANCE_SLOW_THRESHOLD_MS,
                 'channel': self.CHANNEL_PERFORMANCE
-            },
-            'indexing': {
+            }),
+            'indexing': MappingProxyType({
                 'enabled': self.INDEXING_ENABLED,
                 'frequency': self.INDEXING_FREQUENCY,
                 'channel': self.CHANNEL_PERFORMANCE
-            },
-            'semantic': {
+            }),
+            'semantic': MappingProxyType({
                 'enabled': self.SEMANTIC_ENABLED,
                 'frequency': self.SEMANTIC_FREQUENCY,
                 'channel': self.CHANNEL_SEMANTIC
-            }
-        }
-        return configs.get(agent_name.lower(), {})
+            })
+        }))
+
+    def _validate(self):
+        """validate required configuration."""
+        required = [
+            ('SOURCE_DB_NAME', self.SOURCE_DB_NAME),
+            ('SOURCE_DB_USER', self.SOURCE_DB_USER),
+            ('SOURCE_DB_PASSWORD', self.SOURCE_DB_PASSWORD),
+            ('META_DB_USER', self.META_DB_USER),
+            ('META_DB_PASSWORD', self.META_DB_PASSWORD),
+            ('DB_ID', self.DB_ID)
+        ]
+
+        missing = [name for name, value in required if not value]
+
+        if missing:
+            raise ValueError(f"Missing required env variables:{', '.join(missing)}")
+
+    def get_agent_config(self, agent_name: str) -> Mapping[str, Any]:
+        """Get configuration for a specific agent (read-only, shared across calls)."""
+        return self._agent_configs.get(agent_name.lower(), _EMPTY_CONFIG)
 
     def ensure_log_directory(self):
-        """create log directory if it doesnt exist."""
-        log_dir = Path(self.LOG_FILE).parent
-        log_dir.mkdir(parents=True,exist_ok=True)
+        """create log directories if they dont exist (each directory is only created once per process)."""
+        for log_file in (self.LOG_FILE, self.STRUCTURED_LOG_FILE):
+            log_dir = Path(log_file).parent
+            if log_dir in _dirs_created:
+                continue
+            log_dir.mkdir(parents=True,exist_ok=True)
+            _dirs_created.add(log_dir)
 
-        structured_log_dir = Path(self.STRUCTURED_LOG_FILE)
-        structured_log_dir.mkdir(parents= True, exist_ok = True)
+@lru_cache(maxsize=1)
+def get_settings() -> Settings:
+    """Return the process-wide settings, parsing .env only on the first call."""
+    global _DOTENV_LOADED
+    if not _DOTENV_LOADED:
+        load_dotenv()
+        _DOTENV_LOADED = True
+    return Settings()
 
-settings = Settings()
-POSTGRES_URL = settings.POSTGRES_URL
-TIMESCALE_URL = settings.TIMESCALE_URL
-DB_ID = settings.DB_ID
+def __getattr__(name: str):
+    """Lazily resolve the legacy module-level exports from get_settings()."""
+    if name == 'settings':
+        return get_settings()
+    if name in ('POSTGRES_URL', 'TIMESCALE_URL', 'DB_ID'):
+        return getattr(get_settings(), name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
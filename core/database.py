@@ -1,11 +1,51 @@
-from nt import execv
-import asyncpg, asyncio
-from config.settings import POSTGRES_URL, TIMESCALE_URL
-from typing import List,Dict,Callable
+import asyncpg
+from contextlib import asynccontextmanager
+from config.settings import get_settings
+from core.validator import ALLOWED_HYPERTABLES
+from typing import List,Dict,Callable,Iterable,Optional,Tuple
 import logging
 
 logger = logging.getLogger(__name__)
 
+class _BoundConnection:
+    """Query helpers bound to one pool connection, handed out by Database.pg_session()/ts_session()."""
+
+    __slots__ = ('conn',)
+
+    def __init__(self, conn):
+        self.conn = conn
+
+    async def fetch(self, query: str, *args):
+        return await self.conn.fetch(query, *args)
+
+    async def fetchval(self, query: str, *args):
+        return await self.conn.fetchval(query, *args)
+
+    async def fetchrow(self, query: str, *args):
+        return await self.conn.fetchrow(query, *args)
+
+    async def execute(self, query: str, *args):
+        return await self.conn.execute(query, *args)
+
+    async def executemany(self, query: str, args_list: List[tuple]):
+        return await self.conn.executemany(query, args_list)
+
+class _ListenerDispatch:
+    """Per-channel NOTIFY handler. asyncpg gets the bound dispatch() coroutine method,
+    so each event goes straight to the subscriber callback without a closure chain."""
+
+    __slots__ = ('callback', 'channel')
+
+    def __init__(self, callback: Callable, channel: str):
+        self.callback = callback
+        self.channel = channel
+
+    async def dispatch(self, connection, pid, channel_name, payload):
+        try:
+            await self.callback(payload)
+        except Exception as e:
+            logger.error(f"Error in listener callback for {self.channel}: {e}")
+
 class Database:
     """Database connection manager for postgres (source database) and Tigerdata (timescale database (meta database))
     Handles connection pooling, query execution,and listen/notify events.
@@ -15,18 +55,36 @@ class Database:
         self.pg_pool = None #postgres pool connection
         self.ts_pool = None # timescaleDB pool connection
         self.listeners: Dict[str, asyncpg.Connection] = {}
+        self._listener_callbacks: Dict[str, Callable] = {}
 
     async def connect_db(self):
         """establish connection pools for both databases"""
+        settings = get_settings()
+        pool_options = {
+            'statement_cache_size': settings.DB_STATEMENT_CACHE_SIZE,
+            'max_inactive_connection_lifetime': settings.DB_MAX_INACTIVE_CONNECTION_LIFETIME,
+        }
+        if settings.DB_COMMAND_TIMEOUT is not None:
+            pool_options['command_timeout'] = settings.DB_COMMAND_TIMEOUT
+        if not settings.DB_JIT_ENABLED:
+            # applied once per physical connection at startup, not on every acquire
+            pool_options['server_settings'] = {'jit': 'off'}
+
         try:
-            self.pg_pool = await asyncpg.create_pool(POSTGRES_URL,min_size=1,max_size=5)
-            self.ts_pool = await asyncpg.create_pool(TIMESCALE_URL,min_size=1,max_size=5)
+            self.pg_pool = await asyncpg.create_pool(
+                settings.POSTGRES_URL,
+                min_size=settings.SOURCE_DB_POOL_MIN,
+                max_size=settings.SOURCE_DB_POOL_MAX,
+                **pool_options)
+            self.ts_pool = await asyncpg.create_pool(
+                settings.TIMESCALE_URL,
+                min_size=settings.META_DB_POOL_MIN,
+                max_size=settings.META_DB_POOL_MAX,
+                **pool_options)
             logger.info("✅Connection pools established (POSTGRES AND TIGERDATA (TIMESCALE DB))")
-            print("✅Connection pools established (POSTGRES AND TIGERDATA (TIMESCALE DB))")
         
         except Exception as e:
             logger.error(f"❌Database connection error occured: {e}")
-            print(f"❌Database connection error occured: {e}")
             raise
     
     async def close_conn(self):
@@ -38,6 +96,7 @@ class Database:
             except Exception as e:
                 logger.error(f"error closing listener for {channel}: {e}")
         self.listeners.clear()
+        self._listener_callbacks.clear()
 
         if self.pg_pool:
             await self.pg_pool.close()
@@ -45,56 +104,68 @@ class Database:
             await self.ts_pool.close()
         
         logger.info("Database connections closed..")
-        print("Database connections closed..")
+
+#  =================== sessions ======================
+
+    @asynccontextmanager
+    async def pg_session(self):
+        """acquire one postgres connection for a run of queries instead of one per call.
+        usage: async with db.pg_session() as s: await s.fetchval(...)"""
+        async with self.pg_pool.acquire() as conn:
+            yield _BoundConnection(conn)
+
+    @asynccontextmanager
+    async def ts_session(self):
+        """acquire one timescale connection for a run of queries instead of one per call."""
+        async with self.ts_pool.acquire() as conn:
+            yield _BoundConnection(conn)
 
 #  =================== postgres database operations ======================
 
     async def fetch_pg_db(self, query:str, *args):
         """Run a select query and return rows"""
-        async with self.pg_pool.acquire() as conn:
-            return await conn.fetch(query, *args)
+        return await self.pg_pool.fetch(query, *args)
     
     async def fetchval_pg_db(self,query:str, *args):
         """fetch single value from postgres"""
-        async with self.pg_pool.acquire() as conn:
-            return await conn.fetchval(query,*args)
+        return await self.pg_pool.fetchval(query,*args)
         
     async def fetchrow_pg_db(self,query:str,*args):
         """fetch single row from postgres"""
-        async with self.pg_pool.acquire() as conn:
-            return await conn.fetchrow(query, *args)
+        return await self.pg_pool.fetchrow(query, *args)
 
     async def execute_pg_db(self, query: str, *args):
         """Execute insert/update/delete on postgres db"""
-        async with self.pg_pool.acquire() as conn:
-            return await conn.execute(query, *args)
+        return await self.pg_pool.execute(query, *args)
 
     # ===================== tigerdata operations ======================
 
     async def fetch_ts_db(self, query:str, *args):
         """Run a select query on timescaleDB"""
-        async with self.ts_pool.acquire() as conn:
-            return await conn.fetch(query, *args)
+        return await self.ts_pool.fetch(query, *args)
 
     async def fetchval_ts_db(self,query:str, *args):
         """fetch single value from postgres"""
-        async with self.ts_pool.acquire() as conn:
-            return await conn.fetchval(query,*args)
+        return await self.ts_pool.fetchval(query,*args)
         
     async def fetchrow_ts_db(self,query:str,*args):
         """fetch single row from postgres"""
-        async with self.ts_pool.acquire() as conn:
-            return await conn.fetchrow(query, *args)
+        return await self.ts_pool.fetchrow(query, *args)
 
     async def execute_ts_db(self, query: str, *args):
         """Execute insert/update queries on timescale db"""
-        async with self.ts_pool.acquire() as conn:
-            return await conn.execute(query, *args)
+        return await self.ts_pool.execute(query, *args)
 
-    async def execute_ts_db(self,query:str, args_list: List[tuple]):
-        """batch insert/update queries on timescale db"""
-        async with self.ts_pool.acquire() as conn:
-            return await conn.executemany(query, args_list)
+    async def executemany_ts_db(self,query:str, args_list: List[tuple]):
+        """batch insert/update queries on timescale db.
+        rows are sent over the binary protocol against the connection's cached prepared statement."""
+        return await self.ts_pool.executemany(query, args_list)
+
+    async def copy_records_ts_db(self, table_name: str, records: Iterable[tuple], columns: Optional[List[str]] = None, schema: str = "_agentic"):
+        """bulk insert rows into a hypertable through the COPY protocol (much faster than executemany for large batches)"""
+        if table_name not in ALLOWED_HYPERTABLES:
+            raise ValueError(f"COPY to '{table_name}' not allowed. Only known hypertables permitted.")
+        return await self.ts_pool.copy_records_to_table(table_name, records=records, columns=columns, schema_name=schema)
 
 # ================Listen/ NOTIFY events ========================
 
@@ -106,21 +177,16 @@ class Database:
 
         try:        
             conn = await self.pg_pool.acquire()
-            async def listener_callback(connection, pid, channel_name, payload):
-                try:
-                    await callback(payload)
-                except Exception as e:
-                    logger.error(f"Error in listener callback for {channel}: {e}")
+            # a bound async method, so asyncpg recognises it as a coroutine callback
+            listener_callback = _ListenerDispatch(callback, channel).dispatch
             await conn.add_listener(channel,listener_callback)
 
             self.listeners[channel] =conn
-            # await conn.add_listener(channel, lambda *args: asyncio.create_task(callback(args[-1])))
+            self._listener_callbacks[channel] = listener_callback
             logger.info(f"Listening on channel {channel}")
-            print(f"Listening on channel {channel}")
         
         except Exception as e:
-            logger.error("Failed to listen on {channel}: {e}")
-            print(f"❌ Failed to listen on {channel}: {e}")
+            logger.error(f"❌ Failed to listen on {channel}: {e}")
             raise
     
     async def unlisten_channel(self,channel:str):
@@ -131,7 +197,7 @@ class Database:
             
         try:
             conn = self.listeners[channel]
-            await conn.remove_listener(channel)
+            await conn.remove_listener(channel, self._listener_callbacks.pop(channel))
             await self.pg_pool.release(conn)
             del self.listeners[channel]
             logger.info(f"Stopped listening on: {channel}")
@@ -140,9 +206,20 @@ class Database:
 
     async def notify(self,channel: str, payload:str):
         """send a notify event to postgres channel."""
-        async with self.pg_pool.acquire() as conn:
-            await conn.execute("SELECT pg_notify($1,$2)", channel,payload)
-            logger.debug(f"Notified {channel}: {payload[:100]}")
+        await self.pg_pool.execute("SELECT pg_notify($1,$2)", channel,payload)
+        logger.debug(f"Notified {channel}: {payload[:100]}")
+
+    async def notify_many(self, pairs: List[Tuple[str, str]]):
+        """send a batch of (channel, payload) notify events in a single round-trip.
+        note: postgres delivers identical channel+payload pairs from one transaction only once."""
+        if not pairs:
+            return
+        channels = [channel for channel, _ in pairs]
+        payloads = [payload for _, payload in pairs]
+        await self.pg_pool.execute(
+            "SELECT pg_notify(c, p) FROM unnest($1::text[], $2::text[]) AS t(c, p)",
+            channels, payloads)
+        logger.debug(f"Notified {len(pairs)} events in one batch")
 
 
 # =================== utility methods ============================
@@ -161,22 +238,27 @@ class Database:
             return False
 
     async def table_has_data(self, table_name:str,schema:str="public" ,target:str="timescale") -> bool:
-        """check if tables contain any rows/data.."""
+        """check if tables contain any rows/data.. (stops at the first row instead of counting)"""
 
-        query = f"""select count(*) from {schema}.{table_name};"""
+        query = f"""select exists (select 1 from {schema}.{table_name} limit 1);"""
         try:
             if target =="timescale":
-                count = await self.fetchval_ts_db(query)
+                return await self.fetchval_ts_db(query)
             else:
-                count = await self.fetchval_pg_db(query)
-            return count >0
+                return await self.fetchval_pg_db(query)
         except Exception as e:
             logger.error(f"error checking table data: {e}")
             return False
 
-    async def get_table_row_count(self,table_name:str,schema:str= "public",target:str = "timescale") -> int:
-        """get the row count for a table"""
-        
+    async def get_table_row_count(self,table_name:str,schema:str= "public",target:str = "timescale", exact: bool = False) -> int:
+        """get the row count for a table.
+        by default this is the planner estimate; pass exact=True for a full count(*) scan."""
+        if not exact:
+            estimate = await self.get_table_row_count_estimate(table_name, schema, target)
+            # -1 means the table was never vacuumed/analyzed, so there is nothing to estimate from
+            if estimate >= 0:
+                return estimate
+
         query = f"""select count (*) from {schema}.{table_name}"""
         try: 
             if target == "timescale":
@@ -187,6 +269,23 @@ class Database:
             logger.error(f"Error getting row count: {e}")
             return 0
 
+    async def get_table_row_count_estimate(self,table_name:str,schema:str= "public",target:str = "timescale") -> int:
+        """get the approximate row count from catalog statistics (maintained by ANALYZE/autovacuum).
+        returns -1 when no estimate is available."""
+
+        relation = f"{schema}.{table_name}"
+        try:
+            if target == "timescale":
+                # hypertable rows live in chunks, so the parent's reltuples is always 0;
+                # approximate_row_count sums the chunk statistics (and works for plain tables too)
+                estimate = await self.fetchval_ts_db("""select approximate_row_count(to_regclass($1));""", relation)
+            else:
+                estimate = await self.fetchval_pg_db("""select reltuples::bigint from pg_class where oid = to_regclass($1);""", relation)
+            return -1 if estimate is None else int(estimate)
+        except Exception as e:
+            logger.error(f"Error getting row count estimate: {e}")
+            return -1
+
     async def test_connection(self) -> bool:
         """test if both database connections are working.."""
         try:
@@ -1,6 +1,6 @@
-from ast import Call
-import asyncio,json
-from typing import Callable,Dict,Any,List, final
+import asyncio
+import orjson
+from typing import Callable,Dict,Any,List
 from core.database import Database
 import logging
 
@@ -12,11 +12,17 @@ class EventRouter:
     it listens to database notify events and triggers relevant agent callbacks.
     """
 
+    EMIT_BATCH_SIZE = 100 # max events sent per pg_notify round-trip
+    EMIT_FLUSH_INTERVAL = 0.01 # seconds to wait for more events before flushing
+
     def __init__(self,db:Database) -> None:
         self.db=db
         self.subscribers: Dict[str, Callable[[dict],Any]] = {}
         self.running = False
         self.listener_task = None
+        self._emit_queue: asyncio.Queue = asyncio.Queue()
+        self._emit_task = None
+        self._stop_event = asyncio.Event()
 
     def subscribe(self, channel:str, callback: Callable[[dict],Any]):
         """register a callback for a specific event channel.
@@ -27,7 +33,6 @@ class EventRouter:
 
         self.subscribers[channel].append(callback)
         logger.info(f"agent subscribed to channel: {channel}")
-        print(f"agent subscribed to channel: {channel}")
 
     def unsubscribe(self,channel:str, callback: Callable[[dict],Any]):
         """remove a specific callback from a channel."""
@@ -44,28 +49,36 @@ class EventRouter:
         payload is json -> {'channel':'name', 'data':{...}}
         """
         try:
-            data =json.loads(payload)
-
-            if channel in self.subscribers:
-                event_type = data.get('event_type','unknown')
-                logger.info(f"Event recieved on '{channel}': {event_type}")
-                print(f"Event on '{channel}': {event_type}")
-                
-                tasks = []
-                for callback in self.subscribers[channel]:
-                    tasks.append(asyncio.create_task(callback(data)))
-
-                await asyncio.gather(*tasks, return_exceptions=True)
+            data =orjson.loads(payload)
+
+            subs = self.subscribers.get(channel)
+            if subs is None:
+                logger.warning("No subscribers for channel: %s", channel)
+                return
+
+            # %-style args so the message is only built when INFO is enabled
+            logger.info("Event received on '%s': %s", channel, data.get('event_type','unknown'))
+
+            if len(subs) == 1:
+                # common case: no need to spin up tasks for a single subscriber
+                await self._dispatch(channel, subs[0], data)
             else:
-                logger.warning(f"No subscribers for channel: {channel}")
+                async with asyncio.TaskGroup() as tg:
+                    for callback in subs:
+                        tg.create_task(self._dispatch(channel, callback, data))
         
-        except json.JSONDecodeError as e:
+        except orjson.JSONDecodeError as e:
             logger.error(f"❌ Invalid json payload: {e}")
-            print(f"❌ Invalid json payload: {e}")
 
         except Exception as e:
             logger.error(f"❌ Error handling event: {e}")
-            print(f"❌ Error handling event: {e}")
+
+    async def _dispatch(self, channel:str, callback: Callable[[dict],Any], data:dict):
+        """run one subscriber callback; failures are logged so they never cancel sibling subscribers."""
+        try:
+            await callback(data)
+        except Exception as e:
+            logger.error(f"❌ Subscriber callback failed on '{channel}': {e}")
 
     async def start_listening(self):
         """continously listens to postgres notifications.
@@ -76,41 +89,91 @@ class EventRouter:
             return
         
         self.running=True
-        # self.conn = await self.db.pg_pool.acquire()
+        self._stop_event.clear()
         try:
-            for channel in self.subscribers.keys():
+            for channel in list(self.subscribers.keys()):
                 await self.db.listen_channel(
                     channel,
                     lambda payload,ch=channel: self.handle_event(ch,payload))
-                logger.info("Event router listening for events..")
-                print("Event router active....")
+            logger.info("Event router listening for events..")
 
-                while self.running:
-                    await asyncio.sleep(1)
+            # notifications arrive via listener callbacks; just park until stop() is called
+            await self._stop_event.wait()
         except Exception as e:
             logger.error(f"Event router error: {e}")
-            print(f"Event router error: {e}")
             self.running =False
             raise
         finally:
             await self.cleanup()
     
     async def emit(self,channel:str, data:dict):
-        """send notify events to the database, encoded as json"""
+        """queue a notify event for the database, encoded as json.
+        events are flushed in batches by a background task (see _emit_worker);
+        every call is still delivered, identical events just go out in separate batches."""
         try:
-            payload = json.dumps(data)
-            await self.db.notify(channel,payload)
-            logger.info(f"Emitted -> {channel}: {data.get('event_type', 'unknown')}")
-            print(f"Emitted -> {channel}: {data.get('event_type', 'unknown')}")
+            # pg_notify takes text, so decode the utf-8 bytes orjson produces
+            payload = orjson.dumps(data, option=orjson.OPT_NON_STR_KEYS).decode()
         except Exception as e:
             logger.error(f"❌ failed to emit event on {channel}: {e}")
-            print(f"❌ failed to emit event: {e}")
+            return
+
+        if self._emit_task is None or self._emit_task.done():
+            self._emit_task = asyncio.create_task(self._emit_worker())
+
+        self._emit_queue.put_nowait((channel, payload))
+        logger.info("Emitted -> %s: %s", channel, data.get('event_type', 'unknown'))
+
+    async def _emit_worker(self):
+        """drain the emit queue, sending up to EMIT_BATCH_SIZE events per round-trip.
+        a None item is the shutdown sentinel: pending events are flushed and the worker exits."""
+        while True:
+            item = await self._emit_queue.get()
+            if item is None:
+                return
+
+            # give bursts a moment to accumulate unless a full batch is already waiting
+            if self._emit_queue.qsize() < self.EMIT_BATCH_SIZE - 1:
+                await asyncio.sleep(self.EMIT_FLUSH_INTERVAL)
+
+            batch = [item]
+            # postgres folds identical channel+payload notifies within one transaction into one,
+            # so a repeat of a pair already in the batch starts a new batch instead
+            in_batch = {item}
+            stopping = False
+            while len(batch) < self.EMIT_BATCH_SIZE and not self._emit_queue.empty():
+                item = self._emit_queue.get_nowait()
+                if item is None:
+                    stopping = True
+                    break
+                if item in in_batch:
+                    await self._flush_emits(batch)
+                    batch = []
+                    in_batch.clear()
+                batch.append(item)
+                in_batch.add(item)
+
+            await self._flush_emits(batch)
+            if stopping:
+                return
+
+    async def _flush_emits(self, batch: List[tuple]):
+        """send one batch of queued events."""
+        try:
+            await self.db.notify_many(batch)
+        except Exception as e:
+            logger.error(f"❌ failed to emit {len(batch)} events: {e}")
 
     async def stop(self):
         """stops listening to all events and cleanup."""
         logger.info("stopping event router...")
-        print("stopping event router....")
         self.running = False
+        self._stop_event.set()
+
+        # flush whatever is still queued before shutting the emitter down
+        if self._emit_task is not None and not self._emit_task.done():
+            self._emit_queue.put_nowait(None)
+            await self._emit_task
+        self._emit_task = None
 
         await asyncio.sleep(0.5) # give time for some pending tasks to complete
 
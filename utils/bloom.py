@@ -0,0 +1,75 @@
+import hashlib, math, time
+from typing import Iterable
+
+class BloomFilter:
+    """Fixed-size Bloom filter over strings.
+    Answers "definitely not added" or "probably added" (false positive rate ~error_rate at capacity)."""
+
+    __slots__ = ('capacity', 'error_rate', 'num_bits', 'num_hashes', '_bits')
+
+    def __init__(self, capacity: int, error_rate: float = 1e-6):
+        if capacity < 1:
+            raise ValueError("Bloom filter capacity must be at least 1")
+        if not 0 < error_rate < 1:
+            raise ValueError("Bloom filter error rate must be between 0 and 1")
+
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.num_bits = max(8, math.ceil(-capacity * math.log(error_rate) / (math.log(2) ** 2)))
+        self.num_hashes = max(1, round(self.num_bits / capacity * math.log(2)))
+        self._bits = bytearray((self.num_bits + 7) // 8)
+
+    def _positions(self, item: str):
+        # double hashing: k positions from two 64-bit halves of one digest
+        digest = hashlib.blake2b(item.encode('utf-8'), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], 'little')
+        h2 = int.from_bytes(digest[8:], 'little') | 1
+        for i in range(self.num_hashes):
+            yield (h1 + i * h2) % self.num_bits
+
+    def add(self, item: str):
+        bits = self._bits
+        for pos in self._positions(item):
+            bits[pos >> 3] |= 1 << (pos & 7)
+
+    def update(self, items: Iterable[str]):
+        for item in items:
+            self.add(item)
+
+    def __contains__(self, item: str) -> bool:
+        bits = self._bits
+        return all(bits[pos >> 3] & (1 << (pos & 7)) for pos in self._positions(item))
+
+class RotatingBloomFilter:
+    """Two-generation Bloom filter that forgets entries over time.
+    Every rotate_seconds the current filter becomes the previous one and a fresh filter starts,
+    so an added item stays visible for at least rotate_seconds (and at most twice that)."""
+
+    def __init__(self, capacity: int, error_rate: float = 1e-6, rotate_seconds: float = 3600):
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.rotate_seconds = rotate_seconds
+        self._current = BloomFilter(capacity, error_rate)
+        self._previous = None
+        self._rotated_at = time.monotonic()
+
+    def _maybe_rotate(self):
+        now = time.monotonic()
+        if now - self._rotated_at < self.rotate_seconds:
+            return
+        # skipped more than one window: everything in the old filters has aged out
+        self._previous = self._current if now - self._rotated_at < 2 * self.rotate_seconds else None
+        self._current = BloomFilter(self.capacity, self.error_rate)
+        self._rotated_at = now
+
+    def add(self, item: str):
+        self._maybe_rotate()
+        self._current.add(item)
+
+    def update(self, items: Iterable[str]):
+        self._maybe_rotate()
+        self._current.update(items)
+
+    def __contains__(self, item: str) -> bool:
+        self._maybe_rotate()
+        return item in self._current or (self._previous is not None and item in self._previous)
@@ -1,109 +1,213 @@
-import hashlib, json, logging
-from datetime import datetime, timedelta
-from typing import Dict, Any, Optional
+import hashlib, heapq, json, logging, time
+from collections import OrderedDict
+from datetime import datetime, timezone
+from functools import lru_cache
+from typing import Callable, Dict, Any, List, Optional, Set, Tuple
+from config.settings import get_settings
 from core.database import Database
+from utils.bloom import RotatingBloomFilter
+
+try:
+    import xxhash
+except ImportError:
+    xxhash = None
 
 logger = logging.getLogger(__name__)
 
+def _sha256_hexdigest(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+def _blake2b_128_hexdigest(data: bytes) -> str:
+    # stdlib-only option: blake2b is faster than sha256 on 64-bit CPUs,
+    # and 128 bits is far more than a dedup key needs to avoid collisions
+    return hashlib.blake2b(data, digest_size=16).hexdigest()
+
+# fingerprints are only lookup keys, so a fast non-cryptographic hash is fine.
+# sha256 stays the default so rows written before the switch keep matching.
+FINGERPRINT_HASHERS: Dict[str, Callable[[bytes], str]] = {
+    'sha256': _sha256_hexdigest,
+    'blake2b_128': _blake2b_128_hexdigest,
+}
+if xxhash is not None:
+    FINGERPRINT_HASHERS['xxh3_128'] = xxhash.xxh3_128_hexdigest
+
+# primary time column of each hypertable
+_TIME_COLUMNS: Dict[str, str] = {
+    'schema_metadata': 'captured_at',
+    'query_performance': 'executed_at',
+    'index_analytics': 'measured_at',
+    'table_statistics': 'recorded_at',
+    'semantic_relationships': 'discovered_at',
+    'system_health': 'timestamp',
+    'data_quality_metrics': 'measured_at',
+    'agent_actions': 'executed_at'
+}
+
+# per-hypertable query text is built once and never varies (lookback is a bind parameter),
+# so asyncpg's per-connection statement cache reuses the server-side prepared statement
+@lru_cache(maxsize=None)
+def _exists_many_query(hypertable: str) -> str:
+    time_column = _TIME_COLUMNS.get(hypertable, 'timestamp')
+    return f"""SELECT DISTINCT fingerprint FROM _agentic.{hypertable}
+        WHERE fingerprint = ANY($1::text[]) AND {time_column} > NOW() - make_interval(hours => $2::int);"""
+
+@lru_cache(maxsize=None)
+def _last_sync_query(hypertable: str) -> str:
+    time_column = _TIME_COLUMNS.get(hypertable, 'timestamp')
+    return f"""SELECT MAX({time_column}) FROM _agentic.{hypertable} WHERE db_id = $1;"""
+
+@lru_cache(maxsize=None)
+def _recent_fingerprints_query(hypertable: str) -> str:
+    time_column = _TIME_COLUMNS.get(hypertable, 'timestamp')
+    return f"""SELECT fingerprint FROM _agentic.{hypertable}
+        WHERE {time_column} > NOW() - make_interval(hours => $1::int);"""
+
 class DeduplicationEngine:
     """Prevents duplication of data insertion in timescale DB.
     Uses fingerprinting and time-bucketing for efficient deduplication."""
 
-    def __init__(self,db:Database):
+    def __init__(self,db:Database, fingerprint_algorithm: Optional[str] = None, bucket_minutes: Optional[int] = None):
+        # settings are only read for arguments left unset, so an engine built with both needs no DB credentials
         self.db=db
-        self.bucket_minutes = 5,
-        self.cache ={}
+        self.fingerprint_algorithm = fingerprint_algorithm or get_settings().DEDUP_FINGERPRINT_ALGORITHM
+        self._hash = self._resolve_hasher(self.fingerprint_algorithm)
+        self.set_bucket_interval(bucket_minutes if bucket_minutes is not None else get_settings().DEDUP_BUCKET_MINUTES)
+        self.cache: OrderedDict = OrderedDict() # key -> (time.monotonic() stored at, exists), LRU order
         self.cache_ttl = 3600
+        self.cache_max = 100_000
+        # (expires_at, cache_key) min-heap so cleanup only touches expired entries
+        self._exp_heap: List[Tuple[float, str]] = []
+        # optional per-hypertable "definitely not present" filters, see enable_bloom_filter()
+        self._blooms: Dict[str, RotatingBloomFilter] = {}
 
     def generate_fingerprint(self, data: Dict[str, Any], bucket_time: bool = True) -> str:
         """Generate unique fingerprint for data."""
+        key_bytes = self._fingerprint_key(data, bucket_time)
+        fingerprint = self._hash(key_bytes)
+
+        # %-style with precision instead of f-string slicing: nothing is formatted unless DEBUG is on
+        logger.debug("Generated fingerprint: %.16s... from %.100r", fingerprint, key_bytes)
+        return fingerprint
+
+    def generate_fingerprints_batch(self, rows: List[Dict[str, Any]], bucket_time: bool = True) -> List[str]:
+        """Generate fingerprints for many rows, same values as generate_fingerprint() per row.
+        Keys are built in one pass and hashed in a tight loop without per-row logging;
+        rows sharing a key within the batch are only hashed once."""
+        key_of = self._fingerprint_key
+        hash_ = self._hash
+        keys = [key_of(data, bucket_time) for data in rows]
+        hashed: Dict[bytes, str] = {}
+        for key in keys:
+            if key not in hashed:
+                hashed[key] = hash_(key)
+        return [hashed[key] for key in keys]
 
-        key_parts = []
-        key_parts.append(str(data.get('db_id','')))
-        key_parts.append(str(data.get('table_name','')))
-        key_parts.append(str(data.get('event_type', '')))
+    def _fingerprint_key(self, data: Dict[str, Any], bucket_time: bool = True) -> bytes:
+        """Build the ':'-joined identity key that gets hashed into a fingerprint.
+        Parts are encoded as they are collected so the joined key is already bytes for the hasher."""
+        key_parts: List[bytes] = []
+        key_parts.append(str(data.get('db_id','')).encode())
+        key_parts.append(str(data.get('table_name','')).encode())
+        key_parts.append(str(data.get('event_type', '')).encode())
 
         timestamp = data.get('timestamp') or data.get('executed_at') or data.get('recorded_at') or data.get('measured_at')
         if timestamp:
             if bucket_time:
                 bucketed = self._bucket_timestamp(timestamp)
-                key_parts.append(bucketed)
+                key_parts.append(bucketed.encode())
             else:
-                key_parts.append(str(timestamp))
+                key_parts.append(str(timestamp).encode())
 
         if data.get('query_hash'):
-            key_parts.append(str(data['query_hash']))
+            key_parts.append(str(data['query_hash']).encode())
 
         if data.get('index_name'):
-            key_parts.append(str(data['index_name']))
+            key_parts.append(str(data['index_name']).encode())
 
         if data.get('column_name'):
-            key_parts.append(str(data['column_name']))
+            key_parts.append(str(data['column_name']).encode())
 
-    # create a hash
-        key_string = ":".join(key_parts)
-        fingerprint = hashlib.sha256(key_string.encode('utf-8')).hexdigest()
+        return b":".join(key_parts)
 
-        logger.debug(f"Generated fingerprint: {fingerprint[:16]}... from {key_string[:100]}")
-        return fingerprint
+    def _resolve_hasher(self, algorithm: str) -> Callable[[bytes], str]:
+        """Look up the hash function for an algorithm name, falling back to sha256 if its package is missing."""
+        hasher = FINGERPRINT_HASHERS.get(algorithm)
+        if hasher is not None:
+            return hasher
+
+        if algorithm == 'xxh3_128':
+            logger.warning("xxhash is not installed, falling back to sha256 fingerprints")
+            self.fingerprint_algorithm = 'sha256'
+            return _sha256_hexdigest
+
+        raise ValueError(f"Unknown fingerprint algorithm: {algorithm}")
 
     def _bucket_timestamp(self, timestamp) -> str:
-        """Rounding timestamp to the nearest bucket interval"""
+        """Rounding timestamp down to its bucket interval, returned as epoch seconds"""
         if isinstance(timestamp, str):
             try:
                 timestamp = datetime.fromisoformat(timestamp.replace('Z', '+00:00'))
-            except:
-                timestamp = datetime.utcnow()
+            except ValueError:
+                timestamp = datetime.now(timezone.utc)
 
-        minutes = (timestamp.minute // self.bucket_minutes) *self.bucket_minutes
-        bucketed = timestamp.replace(minute=minutes, second = 0, microsecond =0)
+        if timestamp.tzinfo is None:
+            # naive timestamps in this project are utc (datetime.utcnow())
+            timestamp = timestamp.replace(tzinfo=timezone.utc)
 
-        return bucketed.isoformat()
+        epoch = int(timestamp.timestamp())
+        return str(epoch - epoch % (self.bucket_minutes * 60))
 
     async def alread_exists(self,fingerprint: str, hypertable:str, lookback_hours: int=1) -> bool:
         """checks if fingerprint exists in hypertable with lookback time
         returns True if fingerprint exists else False"""
-        cache_key = f"{hypertable}:{fingerprint}"
-        if cache_key in self.cache:
-            cache_time,exists = self.cache[cache_key]
-            if (datetime.utcnow() - cache_time).seconds < self.cache_ttl:
-                logger.debug(f"Cache hit for fingerprint: {fingerprint[:16]}...")
-                return exists
+        return fingerprint in await self.already_exists_many([fingerprint], hypertable, lookback_hours)
 
-        time_column = self._get_time_column(hypertable)
+    async def already_exists_many(self, fingerprints: List[str], hypertable: str, lookback_hours: int = 1) -> Set[str]:
+        """checks a batch of fingerprints with a single query (cache misses only)
+        returns the subset that already exists in the hypertable within the lookback time"""
+        existing: Set[str] = set()
+        misses: List[str] = []
+        now = time.monotonic()
+        for fingerprint in fingerprints:
+            cache_key = f"{hypertable}:{fingerprint}"
+            cached = self.cache.get(cache_key)
+            if cached and now - cached[0] < self.cache_ttl:
+                self.cache.move_to_end(cache_key)
+                logger.debug("Cache hit for fingerprint: %.16s...", fingerprint)
+                if cached[1]:
+                    existing.add(fingerprint)
+            else:
+                misses.append(fingerprint)
 
-        query = f"""SELECT EXISTS (
-        SELECT 1 FROM _agentic.{hypertable} WHERE fingerprint =$1 AND {time_column}> NOW() - INTERVAL '{lookback_hours}' hours);"""
-        
-        try:
-            exists = await self.db.fetchval_ts_db(query,fingerprint)
-            self.cache[cache_key] = (datetime.utcnow(), exists)
+        bloom = self._blooms.get(hypertable)
+        # the filter only covers the window it was loaded and rotates on; wider lookbacks go to the database
+        if bloom is not None and lookback_hours * 3600 <= bloom.rotate_seconds:
+            # anything the filter has never seen can't be in the table, skip the round-trip for it
+            misses = [fingerprint for fingerprint in misses if fingerprint in bloom]
 
-            logger.debug(f"Fingerprint {'exists' if exists else 'not found'}: {fingerprint[:16]}..")
-            return exists
+        if not misses:
+            return existing
+
+        try:
+            rows = await self.db.fetch_ts_db(_exists_many_query(hypertable), misses, int(lookback_hours))
         except Exception as e:
             logger.error(f"Error checking fingerprint existence: {e}")
-            return False
+            return existing
+
+        found = {row['fingerprint'] for row in rows}
+        for fingerprint in misses:
+            self._cache_set(f"{hypertable}:{fingerprint}", fingerprint in found)
+
+        logger.debug("Batch lookup on %s: %d/%d fingerprints exist", hypertable, len(found), len(misses))
+        return existing | found
         
     def _get_time_column(self, hypertable: str) -> str:
         """Get the primary time column name for a hypertable."""
-        time_columns ={
-            'schema_metadata': 'captured_at',
-            'query_performance': 'executed_at',
-            'index_analytics': 'measured_at',
-            'table_statistics': 'recorded_at',
-            'semantic_relationships': 'discovered_at',
-            'system_health': 'timestamp',
-            'data_quality_metrics': 'measured_at',
-            'agent_actions': 'executed_at'
-        }
-
-        return time_columns.get(hypertable,'timestamp')
+        return _TIME_COLUMNS.get(hypertable,'timestamp')
 
     async def get_last_sync_time(self,db_id:str, hypertable: str) ->Optional[datetime]:
         """Get timestamp of last successful sync for a specific database and hypertable"""
-        time_column = self._get_time_column(hypertable)
-        query = f"""SELECT MAX({time_column}) FROM _agentic.{hypertable} WHERE db_id = $1;"""
+        query = _last_sync_query(hypertable)
 
         try:
             last_time = await self.db.fetchval_ts_db(query,db_id)
@@ -115,25 +219,104 @@ class DeduplicationEngine:
             logger.error(f"Error getting last sync time: {e}")
             return None
     
-    async def should_insert(self,data:Dict[str,Any],hypertable: str, lookback_hours: int =1) -> tuple[bool,str]:
-        """see if data should be inserted or not.."""
-        fingerprint = self.generate_fingerprint(data)
+    async def should_insert(self,data:Dict[str,Any],hypertable: str, lookback_hours: int =1, fingerprint: Optional[str] = None) -> tuple[bool,str]:
+        """see if data should be inserted or not..
+        an already computed fingerprint (argument or data['_fp']) is reused, and the result is stored back in data['_fp']."""
+        fingerprint = fingerprint or data.get('_fp') or self.generate_fingerprint(data)
+        data.setdefault('_fp', fingerprint)
         exists = await self.alread_exists(fingerprint, hypertable,lookback_hours)
         return (not exists, fingerprint)
 
+    async def should_insert_many(self, data_list: List[Dict[str, Any]], hypertable: str, lookback_hours: int = 1) -> List[Tuple[bool, str]]:
+        """batched should_insert(): one existence query for the whole list, results in input order.
+        repeats of a fingerprint within the batch are only looked up once and are never inserted twice."""
+        pending = [data for data in data_list if not data.get('_fp')]
+        for data, fingerprint in zip(pending, self.generate_fingerprints_batch(pending)):
+            data['_fp'] = fingerprint
+        fingerprints = [data['_fp'] for data in data_list]
+
+        unique = list(dict.fromkeys(fingerprints))
+        existing = await self.already_exists_many(unique, hypertable, lookback_hours)
+
+        seen: Set[str] = set()
+        decisions: List[Tuple[bool, str]] = []
+        for fingerprint in fingerprints:
+            if fingerprint in seen:
+                decisions.append((False, fingerprint))
+                continue
+            seen.add(fingerprint)
+            decisions.append((fingerprint not in existing, fingerprint))
+        return decisions
+
     async def mark_inserted(self,fingerprint:str, hypertable:str):
         """mark the fingerprint inserted in cache and call this after successfull insertion."""
 
         cache_key = f"{hypertable}:{fingerprint}"
-        self.cache[cache_key] = (datetime.utcnow(),True)
-        logger.debug(f"Marked as insertd: {fingerprint[:16]}...")
+        self._cache_set(cache_key, True)
+        bloom = self._blooms.get(hypertable)
+        if bloom is not None:
+            bloom.add(fingerprint)
+        logger.debug("Marked as inserted: %.16s...", fingerprint)
+
+    def _cache_set(self, cache_key: str, exists: bool):
+        """write a cache entry and schedule its expiry."""
+        now = time.monotonic()
+        self.cache[cache_key] = (now, exists)
+        self.cache.move_to_end(cache_key)
+        if len(self.cache) > self.cache_max:
+            self.cache.popitem(last=False)
+        heapq.heappush(self._exp_heap, (now + self.cache_ttl, cache_key))
+        # refreshed and evicted keys leave stale heap entries behind; rebuild from the live cache
+        # once they pile up so memory stays bounded by cache_max rather than write rate x ttl
+        if len(self._exp_heap) > 2 * self.cache_max:
+            self._compact_exp_heap()
+
+    def _compact_exp_heap(self):
+        """rebuild the expiry heap with exactly one entry per live cache key."""
+        ttl = self.cache_ttl
+        self._exp_heap = [(cached_at + ttl, key) for key, (cached_at, _) in self.cache.items()]
+        heapq.heapify(self._exp_heap)
+
+    async def enable_bloom_filter(self, hypertable: str, lookback_hours: int = 1, capacity: int = 1_000_000, error_rate: float = 1e-6) -> bool:
+        """put a bloom filter in front of the existence query for one hypertable.
+        the filter is warm-loaded with the fingerprints of the last lookback_hours and rotated on that
+        same window, so it is only consulted for lookups with lookback_hours up to that window; longer
+        lookbacks always query the database. only enable it when this engine is the sole writer to the
+        hypertable (and calls mark_inserted after every insert), otherwise rows written elsewhere would be missed."""
+        bloom = RotatingBloomFilter(capacity, error_rate, rotate_seconds=lookback_hours * 3600)
+        try:
+            rows = await self.db.fetch_ts_db(_recent_fingerprints_query(hypertable), int(lookback_hours))
+        except Exception as e:
+            logger.error(f"Error warm-loading bloom filter for {hypertable}: {e}")
+            return False
+
+        bloom.update(row['fingerprint'] for row in rows)
+        self._blooms[hypertable] = bloom
+        logger.info(f"Bloom filter enabled for {hypertable} with {len(rows)} recent fingerprints")
+        return True
+
+    def disable_bloom_filter(self, hypertable: str):
+        """drop the bloom filter for a hypertable; lookups go back to the database."""
+        self._blooms.pop(hypertable, None)
 
     def clear_cache(self):
         "Clearing in-memory fingerprint cache"
         self.cache.clear()
+        self._exp_heap.clear()
         logger.info("deduplication cache got cleared...")
 
-    def set_bucket_interval(self,minutes: str):
+    def set_cache_max(self, max_entries: int):
+        """set the maximum number of cached fingerprints, evicting least recently used ones if needed"""
+        if max_entries < 1:
+            raise ValueError("Cache size must be at least 1")
+        self.cache_max = max_entries
+        while len(self.cache) > self.cache_max:
+            self.cache.popitem(last=False)
+        if len(self._exp_heap) > 2 * self.cache_max:
+            self._compact_exp_heap()
+        logger.info(f"Deduplication cache size is set to {max_entries} entries...")
+
+    def set_bucket_interval(self,minutes: int):
         """set the interval in minutes"""
         if minutes<1 or minutes> 60:
             raise ValueError("Bucket interval must be between 1 and 60 minutes")
@@ -141,14 +324,16 @@ class DeduplicationEngine:
         logger.info(f"Time bucket interval is set to {minutes} mins...")
 
     async def cleanup_old_cache(self):
-        now = datetime.utcnow()
-        expired = []
-        for key, (timestamp,_) in self.cache.items():
-            if (now -timestamp).seconds > self.cache_ttl:
-                expired.append(key)
-
-        for key in expired :
-            del self.cache[key]
+        """drop expired cache entries; pops only the expired part of the expiry heap."""
+        now = time.monotonic()
+        removed = 0
+        while self._exp_heap and self._exp_heap[0][0] <= now:
+            _, key = heapq.heappop(self._exp_heap)
+            entry = self.cache.get(key)
+            # the key may have been refreshed since this expiry was pushed; only drop it if it's really stale
+            if entry is not None and now - entry[0] >= self.cache_ttl:
+                del self.cache[key]
+                removed += 1
 
-        if expired:
-            logger.info(f"Cleaed up {len(expired)} expired cache entries")
\ No newline at end of file
+        if removed:
+            logger.info(f"Cleaned up {removed} expired cache entries")
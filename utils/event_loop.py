@@ -0,0 +1,26 @@
+import asyncio, logging
+from typing import Optional
+
+from config.settings import get_settings
+
+logger = logging.getLogger(__name__)
+
+def install_event_loop(enabled: Optional[bool] = None) -> bool:
+    """Switch asyncio to uvloop when it is installed and enabled.
+    Call once at process start, before the first asyncio.run().
+    Returns True if uvloop is now the active loop policy."""
+    if enabled is None:
+        enabled = get_settings().UVLOOP_ENABLED
+    if not enabled:
+        return False
+
+    try:
+        import uvloop
+    except ImportError:
+        # uvloop is optional (and unavailable on windows), stock asyncio works fine
+        logger.info("uvloop not installed, using the default asyncio event loop")
+        return False
+
+    asyncio.set_event_loop_policy(uvloop.EventLoopPolicy())
+    logger.info("uvloop event loop installed")
+    return True
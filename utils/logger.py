@@ -1,10 +1,10 @@
-import logging,sys, json
+import atexit, logging, queue, sys
+from logging.handlers import QueueHandler, QueueListener
+import orjson
 from pathlib import Path
 from datetime import datetime
 from typing import Optional
 
-from asyncpg import TransactionIntegrityConstraintViolationError
-
 class CustomFormatter(logging.Formatter):
     """Custom formatter for structured outputs."""
 
@@ -17,13 +17,30 @@ class CustomFormatter(logging.Formatter):
         'RESET': '\033[0m'        # Reset
     }
 
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # coloured level names built once instead of an f-string per record
+        reset = self.COLORS['RESET']
+        self._colored_levels = {name: f"{code}{name}{reset}" for name, code in self.COLORS.items() if name != 'RESET'}
+        # records in the same second share one strftime() result
+        self._last_sec = -1
+        self._last_str = ''
+
+    def formatTime(self, record, datefmt=None):
+        sec = int(record.created)
+        if sec != self._last_sec:
+            self._last_str = datetime.fromtimestamp(sec).strftime('%Y-%m-%d %H:%M:%S')
+            self._last_sec = sec
+        return self._last_str
+
     def format(self,record):
         levelname= record.levelname
-        if levelname in self.COLORS:
-            record.levelname = f"{self.COLORS[levelname]}{levelname}{self.COLORS['RESET']}"
-
-        record.asctime = datetime.fromtimestamp(record.created).strftime('%Y-%m-%d %H:%M:%S')
-        return super().format(record)
+        record.levelname = self._colored_levels.get(levelname, levelname)
+        try:
+            return super().format(record)
+        finally:
+            # the same record goes on to the file handler, which must not get the colour codes
+            record.levelname = levelname
 
     
 class AgentLogger:
@@ -37,7 +54,7 @@ class AgentLogger:
             cls._instance =super().__new__(cls)
             cls._instance._initialized = False
 
-            return cls._instance
+        return cls._instance
     
     def __init__(self):
         if self._initialized:
@@ -45,6 +62,8 @@ class AgentLogger:
 
         self._initialized = True
         self.loggers = {}
+        self.listeners = [] # (logger, queue_handler, listener) for each file log written by a background thread
+        atexit.register(self.shutdown)
 
     def setup_logger(self, name:str, log_file:Optional[str]= None,level: str = "INFO",console :bool = True) -> logging.Logger:
         """setup a logger for a specific component"""
@@ -75,11 +94,30 @@ class AgentLogger:
             
             file_format = logging.Formatter('%(asctime)s | %(levelname)s | %(name)s | %(message)s',datefmt='%Y-%m-%d %H:%M:%S')
             file_handler.setFormatter(file_format)
-            logger.addHandler(file_handler)
+
+            # the logging call only enqueues; a listener thread does the actual disk write
+            log_queue = queue.SimpleQueue()
+            queue_handler = QueueHandler(log_queue)
+            queue_handler.setLevel(logging.DEBUG)
+            listener = QueueListener(log_queue, file_handler, respect_handler_level=True)
+            listener.start()
+            self.listeners.append((logger, queue_handler, listener))
+            logger.addHandler(queue_handler)
 
         self.loggers[name] = logger
         return logger
 
+    def shutdown(self):
+        """Flush queued records to disk and stop the listener threads (also runs at interpreter exit).
+        Loggers keep working afterwards: their file handlers are attached directly again."""
+        for logger, queue_handler, listener in self.listeners:
+            listener.stop()
+            # nothing drains the queue any more, so stop feeding it
+            logger.removeHandler(queue_handler)
+            for handler in listener.handlers:
+                logger.addHandler(handler)
+        self.listeners.clear()
+
     def get_logger (self, name: str) -> logging.Logger:
         """Get an existing logger or create a new one."""
         if name not in self.loggers:
@@ -94,16 +132,27 @@ class StructuredLogger:
     def __init__(self,log_file:str):
         self.log_file = Path(log_file)
         self.log_file.parent.mkdir(parents=True, exist_ok=True)
+        # one long-lived handle instead of an open()/close() per event.
+        # binary mode because orjson produces bytes (binary files can't be line-buffered, so log_event flushes)
+        self._fh = open(self.log_file, 'ab')
+        atexit.register(self.close)
 
     def log_event(self,event_type: str, data: dict):
         """Log a structured event as JSON.."""
-        log_entry = {"timestamp":datetime.utcnow().isoformat(),"event_type": event_type,"data":data}
+        # orjson serialises the datetime itself, same ISO format as isoformat()
+        log_entry = {"timestamp":datetime.utcnow(),"event_type": event_type,"data":data}
         try:
-            with open(self.log_file, 'a') as f:
-                f.write(json.dumps(log_entry) + '\n')
+            self._fh.write(orjson.dumps(log_entry, option=orjson.OPT_APPEND_NEWLINE | orjson.OPT_NON_STR_KEYS))
+            self._fh.flush()
         except Exception as e:
             print(f"Failed to write structured log: {e}")
 
+    def close(self):
+        """Flush and close the log file (also runs at interpreter exit)."""
+        if not self._fh.closed:
+            self._fh.close()
+        atexit.unregister(self.close)
+
     def log_agent_action(self, agent_name: str, action: str, details: dict,success: bool):
         """Log an agent action + outcome"""
 
@@ -132,12 +181,111 @@ class StructuredLogger:
             'confidence': confidence,
         })
 
+class ParquetStructuredLogger(StructuredLogger):
+    """
+    Structured logging to Parquet for high-volume audit trails read by analytics jobs.
+    Rows are buffered and written a row group at a time with schema (timestamp, event_type, payload_json).
+    Needs pyarrow; the JSONL StructuredLogger stays the default.
+    """
+    BUFFER_ROWS = 1000
+
+    def __init__(self, log_file: str):
+        try:
+            import pyarrow
+            import pyarrow.parquet
+        except ImportError as e:
+            raise ImportError("pyarrow is required for Parquet structured logs") from e
+
+        self._pa = pyarrow
+        self._pq = pyarrow.parquet
+        self.schema = pyarrow.schema([
+            ('timestamp', pyarrow.timestamp('us')),
+            ('event_type', pyarrow.string()),
+            ('payload_json', pyarrow.string()),
+        ])
+
+        self.log_file = Path(log_file)
+        self.log_file.parent.mkdir(parents=True, exist_ok=True)
+        # a Parquet file can't be appended to once closed, so an existing file is kept and a new one is started next to it
+        if self.log_file.exists():
+            stamp = datetime.utcnow().strftime('%Y%m%dT%H%M%S')
+            self.log_file = self.log_file.with_name(f"{self.log_file.stem}-{stamp}{self.log_file.suffix}")
+
+        self._writer = None # opened on first flush so an idle logger leaves no empty file behind
+        self._timestamps = []
+        self._event_types = []
+        self._payloads = []
+        self._closed = False
+        atexit.register(self.close)
+
+    def log_event(self, event_type: str, data: dict):
+        """Buffer a structured event; the buffer goes to disk every BUFFER_ROWS events and on close()."""
+        if self._closed:
+            return
+        try:
+            self._timestamps.append(datetime.utcnow())
+            self._event_types.append(event_type)
+            self._payloads.append(orjson.dumps(data, option=orjson.OPT_NON_STR_KEYS).decode())
+        except Exception as e:
+            print(f"Failed to write structured log: {e}")
+            return
+
+        if len(self._payloads) >= self.BUFFER_ROWS:
+            self.flush()
+
+    def flush(self):
+        """Write buffered events out as one row group."""
+        if not self._payloads:
+            return
+        try:
+            table = self._pa.Table.from_arrays(
+                [self._pa.array(self._timestamps, type=self._pa.timestamp('us')),
+                 self._pa.array(self._event_types, type=self._pa.string()),
+                 self._pa.array(self._payloads, type=self._pa.string())],
+                schema=self.schema,
+            )
+            if self._writer is None:
+                self._writer = self._pq.ParquetWriter(str(self.log_file), self.schema, compression='zstd')
+            self._writer.write_table(table)
+        except Exception as e:
+            print(f"Failed to write structured log: {e}")
+        finally:
+            self._timestamps.clear()
+            self._event_types.clear()
+            self._payloads.clear()
+
+    def close(self):
+        """Flush buffered events and write the Parquet footer (also runs at interpreter exit)."""
+        if not self._closed:
+            self.flush()
+            if self._writer is not None:
+                self._writer.close()
+            self._closed = True
+        atexit.unregister(self.close)
+
 _agent_logger = AgentLogger()
 
 def get_logger(name:str, log_file:Optional[str] = None, level:str = 'INFO'):
     """Convenience function to get logger"""
     return _agent_logger.setup_logger(name,log_file,level)
 
-def get_structured_logger(log_file:str="logs/structured.jsonl") -> StructuredLogger:
-    """get structured logger for audit trails."""
-    return StructuredLogger(log_file)
\ No newline at end of file
+_structured_loggers = {}
+
+_STRUCTURED_LOGGER_CLASSES = {'jsonl': StructuredLogger, 'parquet': ParquetStructuredLogger}
+
+def get_structured_logger(log_file:Optional[str]=None, format:str='jsonl') -> StructuredLogger:
+    """get structured logger for audit trails (one shared instance, and file handle, per path).
+    format='parquet' writes columnar files for analytics (needs pyarrow)."""
+    if format not in _STRUCTURED_LOGGER_CLASSES:
+        raise ValueError(f"Unknown structured log format: {format}")
+    if log_file is None:
+        log_file = f"logs/structured.{format}"
+
+    key = str(Path(log_file).resolve())
+    logger_class = _STRUCTURED_LOGGER_CLASSES[format]
+    if key not in _structured_loggers:
+        _structured_loggers[key] = logger_class(log_file)
+    elif type(_structured_loggers[key]) is not logger_class:
+        # two sinks on one file would interleave jsonl and parquet bytes
+        raise ValueError(f"Structured log {log_file} is already open with a different format")
+    return _structured_loggers[key]
\ No newline at end of file